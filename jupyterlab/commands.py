@@ -5,8 +5,10 @@
 # Distributed under the terms of the Modified BSD License.
 from __future__ import print_function
 
+from copy import deepcopy
 from distutils.version import LooseVersion
 import errno
+import functools
 import glob
 import hashlib
 import json
@@ -18,17 +20,27 @@ import shutil
 import site
 import sys
 import tarfile
+from concurrent.futures import ThreadPoolExecutor
 from threading import Event
 
 from ipython_genutils.tempdir import TemporaryDirectory
-from ipython_genutils.py3compat import which
 from jupyter_core.paths import jupyter_config_path
 from notebook.nbextensions import GREEN_ENABLED, GREEN_OK, RED_DISABLED, RED_X
 
 from .semver import Range, gte, lt, lte, gt
-from .jlpmapp import YARN_PATH, HERE
+from .jlpmapp import YARN_PATH, HERE, which
 from .process import Process, WatchHelper
 
+try:
+    from os import scandir
+except ImportError:  # py2
+    scandir = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # The regex for expecting the webpack output.
 WEBPACK_EXPECT = re.compile(r'.*/index.out.js')
@@ -72,9 +84,9 @@ def get_app_dir():
         app_dir = pjoin(userbase, 'share', 'jupyter', 'lab')
 
     # Check for a system install in '/usr/local/share'.
-    elif (sys.prefix.startswith('/usr') and not
-          osp.exists(app_dir) and
-          osp.exists('/usr/local/share/jupyter/lab')):
+    elif (sys.prefix.startswith('/usr') and
+          _try_stat(app_dir) is None and
+          _try_stat('/usr/local/share/jupyter/lab') is not None):
         app_dir = '/usr/local/share/jupyter/lab'
 
     return osp.realpath(app_dir)
@@ -85,11 +97,11 @@ def ensure_dev(logger=None):
     """
     parent = pjoin(HERE, '..')
 
-    if not osp.exists(pjoin(parent, 'node_modules')):
+    if not osp.exists(osp.join(parent, 'node_modules')):
         yarn_proc = Process(['node', YARN_PATH], cwd=parent, logger=logger)
         yarn_proc.wait()
 
-    if not osp.exists(pjoin(parent, 'dev_mode', 'build')):
+    if not osp.exists(osp.join(parent, 'dev_mode', 'build')):
         yarn_proc = Process(['node', YARN_PATH, 'build'], cwd=parent,
                             logger=logger)
         yarn_proc.wait()
@@ -109,24 +121,32 @@ def watch_dev(logger=None):
     """
     parent = pjoin(HERE, '..')
 
-    if not osp.exists(pjoin(parent, 'node_modules')):
+    if not osp.exists(osp.join(parent, 'node_modules')):
         yarn_proc = Process(['node', YARN_PATH], cwd=parent, logger=logger)
         yarn_proc.wait()
 
     logger = logger or logging.getLogger('jupyterlab')
     ts_dir = osp.realpath(osp.join(HERE, '..', 'packages', 'metapackage'))
 
-    # Run typescript watch and wait for compilation.
-    ts_regex = r'.* Compilation complete\. Watching for file changes\.'
-    ts_proc = WatchHelper(['node', YARN_PATH, 'run', 'watch'],
-        cwd=ts_dir, logger=logger, startup_regex=ts_regex)
+    # The typescript watchers are started together and we wait for both.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Run typescript watch and wait for compilation.
+        ts_regex = r'.* Compilation complete\. Watching for file changes\.'
+        ts_proc = executor.submit(WatchHelper,
+            ['node', YARN_PATH, 'run', 'watch'],
+            cwd=ts_dir, logger=logger, startup_regex=ts_regex)
 
-    # Run the metapackage file watcher.
-    tsf_regex = 'Watching the metapackage files...'
-    tsf_proc = WatchHelper(['node', YARN_PATH, 'run', 'watch:files'],
-        cwd=ts_dir, logger=logger, startup_regex=tsf_regex)
+        # Run the metapackage file watcher.
+        tsf_regex = 'Watching the metapackage files...'
+        tsf_proc = executor.submit(WatchHelper,
+            ['node', YARN_PATH, 'run', 'watch:files'],
+            cwd=ts_dir, logger=logger, startup_regex=tsf_regex)
+
+    ts_proc = ts_proc.result()
+    tsf_proc = tsf_proc.result()
 
     # Run webpack watch and wait for compilation.
+    # Webpack bundles the compiled libs, so it starts after typescript.
     wp_proc = WatchHelper(['node', YARN_PATH, 'run', 'watch'],
         cwd=DEV_DIR, logger=logger,
         startup_regex=WEBPACK_EXPECT)
@@ -176,7 +196,7 @@ def clean(app_dir=None):
     if app_dir == pjoin(HERE, 'core'):
         raise ValueError('Cannot clean the core app')
     for name in ['staging']:
-        target = pjoin(app_dir, name)
+        target = osp.join(app_dir, name)
         if osp.exists(target):
             shutil.rmtree(target)
 
@@ -195,7 +215,10 @@ def get_app_info(app_dir=None, logger=None):
     """Get a dictionary of information about the app.
     """
     handler = _AppHandler(app_dir, logger)
-    return handler.info
+    info = dict(handler.info)
+    # The core data is shared between handlers, so give the caller a copy.
+    info['core_data'] = deepcopy(info['core_data'])
+    return info
 
 
 def enable_extension(extension, app_dir=None, logger=None):
@@ -253,14 +276,28 @@ def get_app_version():
 
 class _AppHandler(object):
 
+    # The last fast build check result per app dir, keyed on input mtimes.
+    _fast_check_cache = dict()
+
     def __init__(self, app_dir, logger=None, kill_event=None):
         if app_dir and app_dir.startswith(HERE):
             raise ValueError('Cannot run lab extension commands in core app')
-        self.app_dir = app_dir or get_app_dir()
+        self.app_dir = osp.realpath(app_dir or get_app_dir())
         self.sys_dir = get_app_dir()
         self.logger = logger or logging.getLogger('jupyterlab')
-        self.info = self._get_app_info()
         self.kill_event = kill_event or Event()
+        self._info = None
+        self._compat = None
+        self._config_cache = dict()
+        self._dirs_ensured = False
+
+    @property
+    def info(self):
+        """Information about the app, computed on first access.
+        """
+        if self._info is None:
+            self._info = self._get_app_info()
+        return self._info
 
     def install_extension(self, extension, existing=None):
         """Install an extension package into JupyterLab.
@@ -268,10 +305,9 @@ class _AppHandler(object):
         The extension is first validated.
         """
         extension = _normalize_path(extension)
-        extensions = self.info['extensions']
 
         # Check for a core extensions.
-        if extension in self.info['core_extensions']:
+        if extension in _get_core_extensions():
             config = self._read_build_config()
             uninstalled = config.get('uninstalled_core_extensions', [])
             if extension in uninstalled:
@@ -280,6 +316,9 @@ class _AppHandler(object):
                 self._write_build_config(config)
             return
 
+        # Get the existing extensions before adding the new one.
+        extensions = self.info['extensions']
+
         # Create the app dirs if needed.
         self._ensure_app_dirs()
 
@@ -302,6 +341,8 @@ class _AppHandler(object):
             if other['path'] != info['path'] and other['location'] == 'app':
                 os.remove(other['path'])
 
+        self._compat = None
+
     def build(self, name=None, version=None, command='build:prod',
             clean_staging=False):
         """Build the application.
@@ -313,7 +354,7 @@ class _AppHandler(object):
             name=name, version=version, clean=clean_staging
         )
 
-        staging = pjoin(app_dir, 'staging')
+        staging = osp.join(app_dir, 'staging')
 
         # Make sure packages are installed.
         self._run(['node', YARN_PATH, 'install'], cwd=staging)
@@ -325,7 +366,7 @@ class _AppHandler(object):
         """Start the application watcher and then run the watch in
         the background.
         """
-        staging = pjoin(self.app_dir, 'staging')
+        staging = osp.join(self.app_dir, 'staging')
 
         self._populate_staging()
 
@@ -333,7 +374,7 @@ class _AppHandler(object):
         self._run(['node', YARN_PATH, 'install'], cwd=staging)
 
         proc = WatchHelper(['node', YARN_PATH, 'run', 'watch'],
-            cwd=pjoin(self.app_dir, 'staging'),
+            cwd=osp.join(self.app_dir, 'staging'),
             startup_regex=WEBPACK_EXPECT,
             logger=self.logger)
         return [proc]
@@ -344,7 +385,7 @@ class _AppHandler(object):
         logger = self.logger
         info = self.info
 
-        logger.info('JupyterLab v%s' % info['version'])
+        logger.info('JupyterLab v%s', info['version'])
 
         if info['extensions']:
             info['compat_errors'] = self._get_extension_compat()
@@ -358,29 +399,32 @@ class _AppHandler(object):
         if local:
             logger.info('\n   local extensions:')
             for name in sorted(local):
-                logger.info('        %s: %s' % (name, local[name]))
+                logger.info('        %s: %s', name, local[name])
 
         linked_packages = info['linked_packages']
         if linked_packages:
             logger.info('\n   linked packages:')
             for key in sorted(linked_packages):
                 source = linked_packages[key]['source']
-                logger.info('        %s: %s' % (key, source))
+                logger.info('        %s: %s', key, source)
 
         uninstalled_core = info['uninstalled_core']
         if uninstalled_core:
             logger.info('\nUninstalled core extensions:')
-            [logger.info('    %s' % item) for item in sorted(uninstalled_core)]
+            for item in sorted(uninstalled_core):
+                logger.info('    %s', item)
 
         disabled_core = info['disabled_core']
         if disabled_core:
             logger.info('\nDisabled core extensions:')
-            [logger.info('    %s' % item) for item in sorted(disabled_core)]
+            for item in sorted(disabled_core):
+                logger.info('    %s', item)
 
         messages = self.build_check(fast=True)
         if messages:
             logger.info('\nBuild recommended:')
-            [logger.info('    %s' % item) for item in messages]
+            for item in messages:
+                logger.info('    %s', item)
 
     def build_check(self, fast=False):
         """Determine whether JupyterLab should be built.
@@ -388,18 +432,30 @@ class _AppHandler(object):
         Returns a list of messages.
         """
         app_dir = self.app_dir
+        pkg_path = osp.join(app_dir, 'static', 'package.json')
+
+        # Skip the full check if no input changed since the last build.
+        if fast:
+            mtimes = self._get_build_mtimes(pkg_path)
+            static_mtime = mtimes[0]
+            if static_mtime is not None and static_mtime > max(mtimes[1:]):
+                return []
+            cached = self._fast_check_cache.get(app_dir)
+            if cached and cached[0] == mtimes:
+                return list(cached[1])
+
         local = self.info['local_extensions']
         linked = self.info['linked_packages']
         messages = []
 
         # Check for no application.
-        pkg_path = pjoin(app_dir, 'static', 'package.json')
-        if not osp.exists(pkg_path):
+        try:
+            static_data = _load_json(pkg_path)
+        except IOError as e:
+            if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                raise
             return ['No built application']
 
-        with open(pkg_path) as fid:
-            static_data = json.load(fid)
-
         old_jlab = static_data['jupyterlab']
         old_deps = static_data.get('dependencies', dict())
 
@@ -416,24 +472,23 @@ class _AppHandler(object):
         new_deps = new_package.get('dependencies', dict())
 
         for ext_type in ['extensions', 'mimeExtensions']:
+            new_exts = set(new_jlab[ext_type])
+            old_exts = set(old_jlab[ext_type])
+
             # Extensions that were added.
-            for ext in new_jlab[ext_type]:
-                if ext not in old_jlab[ext_type]:
-                    messages.append('%s needs to be included' % ext)
+            for ext in sorted(new_exts - old_exts):
+                messages.append('%s needs to be included' % ext)
 
             # Extensions that were removed.
-            for ext in old_jlab[ext_type]:
-                if ext not in new_jlab[ext_type]:
-                    messages.append('%s needs to be removed' % ext)
-
-        # Look for mismatched dependencies
-        for (pkg, dep) in new_deps.items():
-            if pkg not in old_deps:
-                continue
-            # Skip local and linked since we pick them up separately.
-            if pkg in local or pkg in linked:
-                continue
-            if old_deps[pkg] != dep:
+            for ext in sorted(old_exts - new_exts):
+                messages.append('%s needs to be removed' % ext)
+
+        # Look for mismatched dependencies, skipping local and linked
+        # since we pick them up separately.
+        common = set(new_deps).intersection(old_deps)
+        common.difference_update(local, linked)
+        for pkg in sorted(common):
+            if old_deps[pkg] != new_deps[pkg]:
                 msg = '%s changed from %s to %s'
                 messages.append(msg % (pkg, old_deps[pkg], new_deps[pkg]))
 
@@ -441,7 +496,7 @@ class _AppHandler(object):
         for (name, source) in local.items():
             if fast:
                 continue
-            dname = pjoin(app_dir, 'extensions')
+            dname = osp.join(app_dir, 'extensions')
             if self._check_local(name, source, dname):
                 messages.append('%s content changed' % name)
 
@@ -449,18 +504,20 @@ class _AppHandler(object):
         for (name, item) in linked.items():
             if fast:
                 continue
-            dname = pjoin(app_dir, 'staging', 'linked_packages')
+            dname = osp.join(app_dir, 'staging', 'linked_packages')
             if self._check_local(name, item['source'], dname):
                 messages.append('%s content changed' % name)
 
+        if fast:
+            self._fast_check_cache[app_dir] = (mtimes, list(messages))
+
         return messages
 
     def uninstall_extension(self, name):
         """Uninstall an extension by name.
         """
         # Allow for uninstalled core extensions.
-        data = self.info['core_data']
-        if name in self.info['core_extensions']:
+        if name in _get_core_extensions():
             self.logger.info('Uninstalling core extension %s' % name)
             config = self._read_build_config()
             uninstalled = config.get('uninstalled_core_extensions', [])
@@ -470,24 +527,24 @@ class _AppHandler(object):
                 self._write_build_config(config)
             return True
 
-        local = self.info['local_extensions']
+        data = self.info['extensions'].get(name)
+        if data is None:
+            self.logger.warn('No labextension named "%s" installed' % name)
+            return False
 
-        for (extname, data) in self.info['extensions'].items():
-            path = data['path']
-            if extname == name:
-                msg = 'Uninstalling %s from %s' % (name, osp.dirname(path))
-                self.logger.info(msg)
-                os.remove(path)
-                # Handle local extensions.
-                if extname in local:
-                    config = self._read_build_config()
-                    data = config.setdefault('local_extensions', dict())
-                    del data[extname]
-                    self._write_build_config(config)
-                return True
+        path = data['path']
+        msg = 'Uninstalling %s from %s' % (name, osp.dirname(path))
+        self.logger.info(msg)
+        os.remove(path)
+        self._compat = None
 
-        self.logger.warn('No labextension named "%s" installed' % name)
-        return False
+        # Handle local extensions.
+        if name in self.info['local_extensions']:
+            config = self._read_build_config()
+            local = config.setdefault('local_extensions', dict())
+            del local[name]
+            self._write_build_config(config)
+        return True
 
     def link_package(self, path):
         """Link a package at the given path.
@@ -521,18 +578,12 @@ class _AppHandler(object):
         config = self._read_build_config()
         linked = config.setdefault('linked_packages', dict())
 
-        found = None
-        for (name, source) in linked.items():
-            if name == path or source == path:
-                found = name
-
+        found = _find_name(linked, path)
         if found:
             del linked[found]
         else:
             local = config.setdefault('local_extensions', dict())
-            for (name, source) in local.items():
-                if name == path or source == path:
-                    found = name
+            found = _find_name(local, path)
             if found:
                 del local[found]
                 path = self.info['extensions'][found]['path']
@@ -593,22 +644,26 @@ class _AppHandler(object):
         """Set up the assets in the staging directory.
         """
         app_dir = self.app_dir
-        staging = pjoin(app_dir, 'staging')
+        staging = osp.join(app_dir, 'staging')
         if clean and osp.exists(staging):
             self.logger.info("Cleaning %s", staging)
             shutil.rmtree(staging)
+            self._dirs_ensured = False
 
         self._ensure_app_dirs()
         if not version:
             version = self.info['core_data']['jupyterlab']['version']
 
         # Look for mismatched version.
-        pkg_path = pjoin(staging, 'package.json')
+        pkg_path = osp.join(staging, 'package.json')
         overwrite_lock = False
 
-        if osp.exists(pkg_path):
-            with open(pkg_path) as fid:
-                data = json.load(fid)
+        try:
+            data = _load_json(pkg_path)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        else:
             if data['jupyterlab'].get('version', '') != version:
                 shutil.rmtree(staging)
                 os.makedirs(staging)
@@ -617,30 +672,41 @@ class _AppHandler(object):
 
         for fname in ['index.js', 'webpack.config.js',
                 'yarn.lock', '.yarnrc', 'yarn.js']:
-            target = pjoin(staging, fname)
-            if (fname == 'yarn.lock' and os.path.exists(target) and
+            target = osp.join(staging, fname)
+            target_stat = _try_stat(target)
+            if (fname == 'yarn.lock' and target_stat and
                     not overwrite_lock):
                 continue
-            shutil.copy(pjoin(HERE, 'staging', fname), target)
+            # Skip files that are unchanged since they were copied.
+            source = osp.join(HERE, 'staging', fname)
+            source_stat = os.stat(source)
+            source_mtime = max(source_stat.st_mtime, source_stat.st_ctime)
+            if (target_stat and
+                    target_stat.st_size == source_stat.st_size and
+                    target_stat.st_mtime >= source_mtime):
+                continue
+            shutil.copy(source, target)
 
         # Ensure a clean linked packages directory.
-        linked_dir = pjoin(staging, 'linked_packages')
+        linked_dir = osp.join(staging, 'linked_packages')
         if osp.exists(linked_dir):
             shutil.rmtree(linked_dir)
         os.makedirs(linked_dir)
 
         # Template the package.json file.
         # Update the local extensions.
+        # These are packed one at a time since `yarn install` and
+        # `npm pack` share their caches and may run build scripts.
         extensions = self.info['extensions']
+        dname = osp.join(app_dir, 'extensions')
         for (key, source) in self.info['local_extensions'].items():
-            dname = pjoin(app_dir, 'extensions')
             self._update_local(key, source, dname, extensions[key],
                 'local_extensions')
 
         # Update the linked packages.
         linked = self.info['linked_packages']
+        dname = osp.join(staging, 'linked_packages')
         for (key, item) in linked.items():
-            dname = pjoin(staging, 'linked_packages')
             self._update_local(key, item['source'], dname, item,
                 'linked_packages')
 
@@ -653,7 +719,7 @@ class _AppHandler(object):
         if name:
             data['jupyterlab']['name'] = name
 
-        pkg_path = pjoin(staging, 'package.json')
+        pkg_path = osp.join(staging, 'package.json')
         with open(pkg_path, 'w') as fid:
             json.dump(data, fid, indent=4)
 
@@ -661,14 +727,20 @@ class _AppHandler(object):
         """Get the template the for staging package.json file.
         """
         logger = self.logger
-        data = self.info['core_data']
+        data = deepcopy(self.info['core_data'])
         local = self.info['local_extensions']
         linked = self.info['linked_packages']
         extensions = self.info['extensions']
         jlab = data['jupyterlab']
 
+        staging = osp.join(self.app_dir, 'staging')
+        staging_prefix = staging + os.sep
+
         def format_path(path):
-            path = osp.relpath(path, pjoin(self.app_dir, 'staging'))
+            if path.startswith(staging_prefix):
+                path = path[len(staging_prefix):]
+            else:
+                path = osp.relpath(path, staging)
             path = 'file:' + path.replace(os.sep, '/')
             if os.name == 'nt':
                 path = path.lower()
@@ -706,8 +778,7 @@ class _AppHandler(object):
 
         # Handle linked packages.
         for (key, item) in linked.items():
-            path = pjoin(self.app_dir, 'staging', 'linked_packages')
-            path = pjoin(path, item['filename'])
+            path = osp.join(staging, 'linked_packages', item['filename'])
             data['dependencies'][key] = format_path(path)
             jlab['linkedPackages'][key] = item['source']
 
@@ -722,12 +793,30 @@ class _AppHandler(object):
 
         return data
 
+    def _get_build_mtimes(self, pkg_path):
+        """Get the mtime of the built package data followed by the
+        change times of the build inputs.
+
+        The change time of an input is the later of its mtime and ctime,
+        since an installed file can keep an older mtime from its archive.
+        """
+        mtimes = []
+        stat = _try_stat(pkg_path)
+        mtimes.append(stat.st_mtime if stat else None)
+        for path in [osp.join(self.app_dir, 'extensions'),
+                     osp.join(self.sys_dir, 'extensions'),
+                     osp.join(self.app_dir, 'settings', 'build_config.json'),
+                     osp.join(HERE, 'staging', 'package.json')]:
+            stat = _try_stat(path)
+            mtimes.append(max(stat.st_mtime, stat.st_ctime) if stat else 0)
+        return tuple(mtimes)
+
     def _check_local(self, name, source, dname):
         # Extract the package in a temporary directory.
         with TemporaryDirectory() as tempdir:
             info = self._extract_package(source, tempdir)
             # Test if the file content has changed.
-            target = pjoin(dname, info['filename'])
+            target = osp.join(dname, info['filename'])
             return not osp.exists(target)
 
     def _update_local(self, name, source, dname, data, dtype):
@@ -742,14 +831,14 @@ class _AppHandler(object):
             if info['filename'] == existing:
                 return existing
 
-            shutil.move(info['path'], pjoin(dname, info['filename']))
+            shutil.move(info['path'], osp.join(dname, info['filename']))
 
         # Remove the existing tarball and return the new file name.
         if existing:
-            os.remove(pjoin(dname, existing))
+            os.remove(osp.join(dname, existing))
 
         data['filename'] = info['filename']
-        data['path'] = pjoin(data['tar_dir'], data['filename'])
+        data['path'] = osp.join(data['tar_dir'], data['filename'])
         return info['filename']
 
     def _get_extensions(self, core_data):
@@ -759,13 +848,13 @@ class _AppHandler(object):
         extensions = dict()
 
         # Get system level packages.
-        sys_path = pjoin(self.sys_dir, 'extensions')
-        app_path = pjoin(self.app_dir, 'extensions')
+        sys_path = osp.join(self.sys_dir, 'extensions')
+        app_path = osp.join(self.app_dir, 'extensions')
 
         extensions = self._get_extensions_in_dir(self.sys_dir, core_data)
 
         # Look in app_dir if different.
-        app_path = pjoin(app_dir, 'extensions')
+        app_path = osp.join(app_dir, 'extensions')
         if app_path == sys_path or not osp.exists(app_path):
             return extensions
 
@@ -778,12 +867,11 @@ class _AppHandler(object):
         """
         extensions = dict()
         location = 'app' if dname == self.app_dir else 'sys'
-        for target in glob.glob(pjoin(dname, 'extensions', '*.tgz')):
-            data = _read_package(target)
+        paths = _list_tarballs(osp.join(dname, 'extensions'))
+        for (path, data) in zip(paths, _read_packages(paths)):
             deps = data.get('dependencies', dict())
             name = data['name']
             jlab = data.get('jupyterlab', dict())
-            path = osp.realpath(target)
             extensions[name] = dict(path=path,
                                     filename=osp.basename(path),
                                     version=data['version'],
@@ -796,11 +884,14 @@ class _AppHandler(object):
     def _get_extension_compat(self):
         """Get the extension compatibility info.
         """
+        if self._compat is not None:
+            return self._compat
         compat = dict()
         core_data = self.info['core_data']
         for (name, data) in self.info['extensions'].items():
             deps = data['dependencies']
             compat[name] = _validate_compatibility(name, deps, core_data)
+        self._compat = compat
         return compat
 
     def _get_local_extensions(self):
@@ -812,16 +903,15 @@ class _AppHandler(object):
         """Get the linked packages.
         """
         info = self._get_local_data('linked_packages')
-        dname = pjoin(self.app_dir, 'staging', 'linked_packages')
+        dname = osp.join(self.app_dir, 'staging', 'linked_packages')
         for (name, source) in info.items():
             info[name] = dict(source=source, filename='', tar_dir=dname)
 
         if not osp.exists(dname):
             return info
 
-        for path in glob.glob(pjoin(dname, '*.tgz')):
-            path = osp.realpath(path)
-            data = _read_package(path)
+        paths = _list_tarballs(dname)
+        for (path, data) in zip(paths, _read_packages(paths)):
             name = data['name']
             if name not in info:
                 self.logger.warn('Removing orphaned linked package %s' % name)
@@ -838,19 +928,24 @@ class _AppHandler(object):
         """Get the uninstalled core extensions.
         """
         config = self._read_build_config()
-        return config.get('uninstalled_core_extensions', [])
+        return list(config.get('uninstalled_core_extensions', []))
 
     def _ensure_app_dirs(self):
         """Ensure that the application directories exist"""
+        if self._dirs_ensured:
+            return
         dirs = ['extensions', 'settings', 'staging', 'schemas', 'themes']
         for dname in dirs:
-            path = pjoin(self.app_dir, dname)
-            if not osp.exists(path):
-                try:
+            path = osp.join(self.app_dir, dname)
+            try:
+                os.mkdir(path)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    # The app directory itself does not exist yet.
                     os.makedirs(path)
-                except OSError as e:
-                    if e.errno != errno.EEXIST:
-                        raise
+                elif e.errno != errno.EEXIST:
+                    raise
+        self._dirs_ensured = True
 
     def _list_extensions(self, info, ext_type):
         """List the extensions of a given type.
@@ -861,6 +956,7 @@ class _AppHandler(object):
             return
 
         dname = info['%s_dir' % ext_type]
+        is_disabled = _get_disabled_test(info['disabled'])
 
         logger.info('   %s dir: %s' % (ext_type, dname))
         for name in sorted(names):
@@ -869,7 +965,7 @@ class _AppHandler(object):
             version = data['version']
             errors = info['compat_errors'][name]
             extra = ''
-            if _is_disabled(name, info['disabled']):
+            if is_disabled(name):
                 extra += ' %s' % RED_DISABLED
             else:
                 extra += ' %s' % GREEN_ENABLED
@@ -889,38 +985,57 @@ class _AppHandler(object):
     def _read_build_config(self):
         """Get the build config data for the app dir.
         """
-        target = pjoin(self.app_dir, 'settings', 'build_config.json')
-        if not osp.exists(target):
-            return {}
-        else:
-            with open(target) as fid:
-                return json.load(fid)
+        target = osp.join(self.app_dir, 'settings', 'build_config.json')
+        return self._read_config(target)
 
     def _write_build_config(self, config):
         """Write the build config to the app dir.
         """
-        self._ensure_app_dirs()
-        target = pjoin(self.app_dir, 'settings', 'build_config.json')
-        with open(target, 'w') as fid:
-            json.dump(config, fid, indent=4)
+        target = osp.join(self.app_dir, 'settings', 'build_config.json')
+        content = json.dumps(config, indent=4)
+
+        # Leave the file alone if the content did not change.
+        try:
+            with open(target) as fid:
+                changed = fid.read() != content
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            changed = True
+
+        if changed:
+            self._ensure_app_dirs()
+            with open(target, 'w') as fid:
+                fid.write(content)
+        self._config_cache[target] = (os.stat(target).st_mtime, config)
 
     def _read_page_config(self):
         """Get the page config data for the app dir.
         """
-        target = pjoin(self.app_dir, 'settings', 'page_config.json')
-        if not osp.exists(target):
-            return {}
-        else:
-            with open(target) as fid:
-                return json.load(fid)
+        target = osp.join(self.app_dir, 'settings', 'page_config.json')
+        return self._read_config(target)
 
     def _write_page_config(self, config):
         """Write the build config to the app dir.
         """
         self._ensure_app_dirs()
-        target = pjoin(self.app_dir, 'settings', 'page_config.json')
+        target = osp.join(self.app_dir, 'settings', 'page_config.json')
         with open(target, 'w') as fid:
             json.dump(config, fid, indent=4)
+        self._config_cache[target] = (os.stat(target).st_mtime, config)
+
+    def _read_config(self, target):
+        """Read the data in a config file.
+
+        The data is shared by the handler until the file's mtime changes.
+        """
+        stat = _try_stat(target)
+        mtime = stat.st_mtime if stat else None
+        cached = self._config_cache.get(target)
+        if cached is None or cached[0] != mtime:
+            data = _load_json(target) if stat else {}
+            cached = self._config_cache[target] = (mtime, data)
+        return cached[1]
 
     def _get_local_data(self, source):
         """Get the local data for extensions or linked packages.
@@ -928,10 +1043,8 @@ class _AppHandler(object):
         config = self._read_build_config()
 
         data = config.setdefault(source, dict())
-        dead = []
-        for (name, source) in data.items():
-            if not osp.exists(source):
-                dead.append(name)
+        missing = _find_missing(data.values())
+        dead = [name for (name, path) in data.items() if path in missing]
 
         for name in dead:
             link_type = source.replace('_', ' ')
@@ -942,7 +1055,7 @@ class _AppHandler(object):
         if dead:
             self._write_build_config(config)
 
-        return data
+        return dict(data)
 
     def _install_extension(self, extension, tempdir):
         """Install an extension with validation and return the name and path.
@@ -967,7 +1080,7 @@ class _AppHandler(object):
             raise ValueError(msg)
 
         # Move the file to the app directory.
-        target = pjoin(self.app_dir, 'extensions', info['filename'])
+        target = osp.join(self.app_dir, 'extensions', info['filename'])
         if osp.exists(target):
             os.remove(target)
 
@@ -979,7 +1092,7 @@ class _AppHandler(object):
     def _extract_package(self, source, tempdir):
         # npm pack the extension
         is_dir = osp.exists(source) and osp.isdir(source)
-        if is_dir and not osp.exists(pjoin(source, 'node_modules')):
+        if is_dir and not osp.exists(osp.join(source, 'node_modules')):
             self._run(['node', YARN_PATH, 'install'], cwd=source)
 
         info = dict(source=source, is_dir=is_dir)
@@ -989,14 +1102,18 @@ class _AppHandler(object):
             msg = '"%s" is not a valid npm package'
             raise ValueError(msg % source)
 
-        path = glob.glob(pjoin(tempdir, '*.tgz'))[0]
-        info['data'] = _read_package(path)
+        # The temporary directory only holds the packed tarball.
+        path = next(osp.join(tempdir, fname) for fname in os.listdir(tempdir)
+                    if fname.endswith('.tgz'))
         if is_dir:
-            info['sha'] = sha = _tarsum(path)
+            info['data'], info['sha'] = _read_package_and_sum(path)
+            sha = info['sha']
             target = path.replace('.tgz', '-%s.tgz' % sha)
-            shutil.move(path, target)
+            # Both paths are in the temporary directory.
+            _replace(path, target)
             info['path'] = target
         else:
+            info['data'] = _read_package(path)
             info['path'] = path
 
         info['filename'] = osp.basename(info['path'])
@@ -1019,6 +1136,29 @@ class _AppHandler(object):
         return proc.wait()
 
 
+def _memoize(maxsize=None):
+    """Cache the results of a function keyed on its positional arguments.
+
+    A minimal stand-in for `functools.lru_cache`, which is not available
+    on Python 2.  The cache is emptied once it reaches `maxsize` entries.
+    """
+    def decorator(func):
+        cache = dict()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            if args in cache:
+                return cache[args]
+            if maxsize is not None and len(cache) >= maxsize:
+                cache.clear()
+            cache[args] = result = func(*args)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
 def _normalize_path(extension):
     """Normalize a given extension if it is a path.
     """
@@ -1028,17 +1168,123 @@ def _normalize_path(extension):
     return extension
 
 
+def _load_json(path):
+    """Load the JSON data in a file.
+
+    Reading the raw bytes and decoding them at once is faster than
+    parsing through a text file object.
+    """
+    with open(path, 'rb') as fid:
+        return _json_loads(fid.read())
+
+
+def _json_loads(raw):
+    """Parse JSON data from UTF-8 encoded bytes.
+
+    Uses `orjson` when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def _find_name(sources, key):
+    """Find the name in a mapping of names to sources given either one.
+    """
+    if key in sources:
+        return key
+    names = dict((source, name) for (name, source) in sources.items())
+    return names.get(key)
+
+
+def _replace(src, dst):
+    """Rename a file, replacing the destination if it exists.
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+    # Python 2 cannot rename over an existing file on Windows.
+    if os.name == 'nt' and osp.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def _try_stat(path):
+    """Get the stat result for a path, or `None` if it cannot be found.
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _find_missing(paths):
+    """Get the set of paths that do not exist.
+
+    Paths that share a parent directory are looked up in a single listing
+    of that directory.  A listing can miss names that still exist, e.g.
+    on case-insensitive file systems, and it includes broken symlinks, so
+    links and any path that is not found in it are checked with
+    `osp.exists`.
+    """
+    groups = dict()
+    for path in paths:
+        groups.setdefault(osp.dirname(path), []).append(path)
+
+    missing = set()
+    for (dname, group) in groups.items():
+        names = set()
+        if len(group) > 1 and scandir is not None:
+            try:
+                names = set(entry.name for entry in scandir(dname)
+                            if not entry.is_symlink())
+            except OSError:
+                pass
+        for path in group:
+            if osp.basename(path) not in names and not osp.exists(path):
+                missing.add(path)
+    return missing
+
+
+def _list_tarballs(dname):
+    """Get the real paths of the tarballs in a given directory.
+    """
+    if scandir is None:
+        paths = glob.glob(osp.join(dname, '*.tgz'))
+        return [osp.realpath(path) for path in paths]
+
+    try:
+        entries = scandir(dname)
+    except OSError:
+        return []
+
+    paths = []
+    for entry in entries:
+        if not entry.name.endswith('.tgz'):
+            continue
+        # Only links need to be resolved, `dname` itself is a real path.
+        if entry.is_symlink():
+            paths.append(osp.realpath(entry.path))
+        elif entry.is_file():
+            paths.append(entry.path)
+    return paths
+
+
 def _read_package(target):
     """Read the package data in a given target tarball.
     """
-    tar = tarfile.open(target, "r:gz")
-    f = tar.extractfile('package/package.json')
-    data = json.loads(f.read().decode('utf8'))
-    data['jupyterlab_extracted_files'] = [
-        f.path[len('package/'):] for f in tar.getmembers()
-    ]
-    tar.close()
-    return data
+    return _scan_package(target)
+
+
+def _read_packages(targets):
+    """Read the package data in a list of target tarballs.
+
+    The tarballs are read in a thread pool since the work is I/O bound.
+    """
+    if len(targets) <= 2:
+        return [_read_package(target) for target in targets]
+    with ThreadPoolExecutor(max_workers=min(8, len(targets))) as executor:
+        return list(executor.map(_read_package, targets))
 
 
 def _validate_extension(data):
@@ -1065,6 +1311,7 @@ def _validate_extension(data):
         messages.append(msg)
 
     files = data['jupyterlab_extracted_files']
+    file_set = set(files)
     main = data.get('main', 'index.js')
     if not main.endswith('.js'):
         main += '.js'
@@ -1079,64 +1326,155 @@ def _validate_extension(data):
     elif mime_extension and not mime_extension.endswith('.js'):
         mime_extension += '.js'
 
-    if extension and extension not in files:
+    if extension and extension not in file_set:
         messages.append('Missing extension module "%s"' % extension)
 
-    if mime_extension and mime_extension not in files:
+    if mime_extension and mime_extension not in file_set:
         messages.append('Missing mimeExtension module "%s"' % mime_extension)
 
-    if themeDir and not any(f.startswith(themeDir) for f in files):
+    # Look for the theme and schema files in a single pass.
+    has_theme = not themeDir
+    has_schema = not schemaDir
+    for f in files:
+        if has_theme and has_schema:
+            break
+        has_theme = has_theme or f.startswith(themeDir)
+        has_schema = has_schema or f.startswith(schemaDir)
+
+    if not has_theme:
         messages.append('themeDir is empty: "%s"' % themeDir)
 
-    if schemaDir and not any(f.startswith(schemaDir) for f in files):
+    if not has_schema:
         messages.append('schemaDir is empty: "%s"' % schemaDir)
 
     return messages
 
 
-def _tarsum(input_file):
+def _read_package_and_sum(target):
+    """Read the package data in a given target tarball along with the
+    recursive content hash of its files.
+
+    The tarball bytes are not hashed since older versions of `npm pack`
+    record file times in the archive.
     """
-    Compute the recursive sha sum of a tar file.
+    h = _new_hash()
+    data = _scan_package(target, h)
+    return data, h.hexdigest()
+
+
+def _scan_package(target, h=None):
+    """Read the package data in a tarball in a single streaming pass.
+
+    If a hash is given, it is updated with the digest of every file.
     """
-    tar = tarfile.open(input_file, "r:gz")
-    chunk_size = 100 * 1024
-    h = hashlib.new("sha1")
+    names = []
+    package = None
+
+    # Stream mode walks the members once without building an index.
+    with open(target, 'rb', 1 << 20) as fid, \
+            tarfile.open(fileobj=fid, mode="r|gz") as tar:
+        for member in tar:
+            names.append(member.path)
+            if not member.isfile():
+                continue
 
-    for member in tar:
-        if not member.isfile():
-            continue
-        f = tar.extractfile(member)
-        data = f.read(chunk_size)
-        while data:
-            h.update(data)
-            data = f.read(chunk_size)
-    return h.hexdigest()
+            # Not every tarball uses `package` as its top level folder.
+            name = member.name
+            if (name.count('/') == 1 and name.endswith('/package.json') and
+                    (package is None or name == 'package/package.json')):
+                raw = tar.extractfile(member).read()
+                package = (name, raw)
+                if h is not None:
+                    inner = _new_hash()
+                    inner.update(raw)
+                    h.update(inner.digest())
+            elif h is not None:
+                f = tar.extractfile(member)
+                h.update(_file_digest(f).digest())
+
+    if package is None:
+        raise KeyError('No package.json found in %s' % target)
+    root = package[0][:-len('package.json')]
+    data = _json_loads(package[1])
+    data['jupyterlab_extracted_files'] = [
+        name[len(root):] for name in names
+    ]
+    return data
+
+
+def _new_hash():
+    """Create the hash used to name content addressed tarballs.
+
+    The hash is not used for security, so we prefer BLAKE2b over SHA-1
+    for its speed.  Both give 40 character hex digests.
+    """
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(digest_size=20)
+    return hashlib.sha1()  # py2
+
+
+def _file_digest(fileobj):
+    """Compute the content hash of a binary file object.
+    """
+    # Python 3.11+ runs the read loop in C.
+    if hasattr(hashlib, 'file_digest'):
+        return hashlib.file_digest(fileobj, _new_hash)
+
+    h = _new_hash()
+    update = h.update
+    size = 1024 * 1024
+    readinto = getattr(fileobj, 'readinto', None)
+    if readinto is None:  # py2 tar members
+        read = fileobj.read
+        for data in iter(lambda: read(size), b''):
+            update(data)
+        return h
+
+    # Reuse one buffer rather than allocating a bytes object per chunk.
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while True:
+        n = readinto(buf)
+        if not n:
+            break
+        update(view[:n])
+    return h
 
 
 def _get_core_data():
     """Get the data for the app template.
+
+    The parsed data is shared between calls and must not be modified.
     """
-    with open(pjoin(HERE, 'staging', 'package.json')) as fid:
-        return json.load(fid)
+    path = osp.join(HERE, 'staging', 'package.json')
+    return _core_data_cached(path, os.stat(path).st_mtime)
+
+
+@_memoize(maxsize=1)
+def _core_data_cached(path, mtime):
+    """Read the data for the app template at a given modification time.
+    """
+    return _load_json(path)
 
 
 def _validate_compatibility(extension, deps, core_data):
     """Validate the compatibility of an extension.
     """
     core_deps = core_data['dependencies']
-    singletons = core_data['jupyterlab']['singletonPackages']
+    singletons = set(core_data['jupyterlab']['singletonPackages'])
 
     errors = []
 
-    for (key, value) in deps.items():
-        if key in singletons:
-            overlap = _test_overlap(core_deps[key], value)
-            if overlap is False:
-                errors.append((key, core_deps[key], value))
+    for key in sorted(singletons.intersection(deps)):
+        value = deps[key]
+        overlap = _test_overlap(core_deps[key], value)
+        if overlap is False:
+            errors.append((key, core_deps[key], value))
 
     return errors
 
 
+@_memoize(maxsize=1024)
 def _test_overlap(spec1, spec2):
     """Test whether two version specs overlap.
 
@@ -1144,8 +1482,8 @@ def _test_overlap(spec1, spec2):
     otherwise whether there is an overlap
     """
     # Test for overlapping semver ranges.
-    r1 = Range(spec1, True)
-    r2 = Range(spec2, True)
+    r1 = _parse_range(spec1, True)
+    r2 = _parse_range(spec2, True)
 
     # If either range is empty, we cannot verify.
     if not r1.range or not r2.range:
@@ -1187,15 +1525,57 @@ def _test_overlap(spec1, spec2):
     )
 
 
-def _is_disabled(name, disabled=[]):
-    """Test whether the package is disabled.
+@_memoize()
+def _parse_range(spec, loose):
+    """Parse a semver range spec.
+
+    The parsed ranges are shared between calls and must not be modified.
     """
-    for pattern in disabled:
-        if name == pattern:
-            return True
-        if re.compile(pattern).match(name) is not None:
+    return Range(spec, loose)
+
+
+def _get_disabled_test(disabled=[]):
+    """Get a function that tests whether a package is disabled.
+
+    The patterns are combined into a single regex where possible so that
+    each name is matched once.
+    """
+    names = frozenset(disabled)
+    default_flags = _compile('').flags
+
+    # Patterns with inline flags or groups are matched on their own:
+    # global flags would apply to every alternative and group references
+    # would be renumbered in a combined regex.
+    simple = []
+    patterns = []
+    for pattern in sorted(names):
+        compiled = _compile(pattern)
+        if compiled.flags == default_flags and not compiled.groups:
+            simple.append(pattern)
+        else:
+            patterns.append(compiled)
+
+    if len(simple) > 1:
+        patterns.append(re.compile('|'.join('(?:%s)' % p for p in simple)))
+    else:
+        patterns.extend(_compile(p) for p in simple)
+
+    def is_disabled(name):
+        if name in names:
             return True
-    return False
+        for pattern in patterns:
+            if pattern.match(name) is not None:
+                return True
+        return False
+
+    return is_disabled
+
+
+@_memoize()
+def _compile(pattern):
+    """Compile a regex pattern.
+    """
+    return re.compile(pattern)
 
 
 def _format_compatibility_errors(name, version, errors):
@@ -1204,25 +1584,32 @@ def _format_compatibility_errors(name, version, errors):
     msgs = []
     l0 = 10
     l1 = 10
-    for error in errors:
-        pkg, jlab, ext = error
-        jlab = str(Range(jlab, True))
-        ext = str(Range(ext, True))
+    for (pkg, jlab, ext) in errors:
+        jlab = _format_range(jlab)
+        ext = _format_range(ext)
         msgs.append((pkg, jlab, ext))
         l0 = max(l0, len(pkg) + 1)
         l1 = max(l1, len(jlab) + 1)
 
-    msg = '\n"%s@%s" is not compatible with the current JupyterLab'
-    msg = msg % (name, version)
-    msg += '\nConflicting Dependencies:\n'
-    msg += 'JupyterLab'.ljust(l0)
-    msg += 'Extension'.ljust(l1)
-    msg += 'Package\n'
-
+    out = [
+        '\n"%s@%s" is not compatible with the current JupyterLab' % (
+            name, version),
+        '\nConflicting Dependencies:\n',
+        'JupyterLab'.ljust(l0),
+        'Extension'.ljust(l1),
+        'Package\n'
+    ]
     for (pkg, jlab, ext) in msgs:
-        msg += jlab.ljust(l0) + ext.ljust(l1) + pkg + '\n'
+        out.append(jlab.ljust(l0) + ext.ljust(l1) + pkg + '\n')
 
-    return msg
+    return ''.join(out)
+
+
+@_memoize()
+def _format_range(spec):
+    """Get the normalized string form of a semver range.
+    """
+    return str(_parse_range(spec, True))
 
 
 def _get_core_extensions():
@@ -9,6 +9,7 @@ import atexit
 import logging
 import os
 import re
+import select
 import signal
 import sys
 import threading
@@ -100,11 +101,20 @@ class Process(object):
         """
         proc = self.proc
         kill_event = self._kill_event
-        while proc.poll() is None:
-            if kill_event.is_set():
-                self.terminate()
-                raise ValueError('Process was aborted')
-            time.sleep(1.)
+        poller = self._create_exit_poller()
+        try:
+            while proc.poll() is None:
+                if kill_event.is_set():
+                    self.terminate()
+                    raise ValueError('Process was aborted')
+                if poller:
+                    # Wake up as soon as the process exits.
+                    poller[0].poll(1000)
+                else:
+                    time.sleep(1.)
+        finally:
+            if poller:
+                os.close(poller[1])
         return self.terminate()
 
     @gen.coroutine
@@ -121,6 +131,22 @@ class Process(object):
 
         raise gen.Return(self.terminate())
 
+    def _create_exit_poller(self):
+        """Create a poller that is woken when the process exits.
+
+        Returns a `(poll, pidfd)` tuple, or `None` if process file
+        descriptors are not supported (Python < 3.9 or Linux < 5.3).
+        """
+        if not hasattr(os, 'pidfd_open') or self.proc.poll() is not None:
+            return None
+        try:
+            pidfd = os.pidfd_open(self.proc.pid)
+        except OSError:
+            return None
+        poll = select.poll()
+        poll.register(pidfd, select.POLLIN)
+        return poll, pidfd
+
     def _create_process(self, **kwargs):
         """Create the process.
         """
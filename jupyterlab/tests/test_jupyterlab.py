@@ -8,6 +8,7 @@ import json
 import os
 import shutil
 import sys
+import tarfile
 from os.path import join as pjoin
 from unittest import TestCase
 import pytest
@@ -28,7 +29,8 @@ from jupyterlab.commands import (
     install_extension, uninstall_extension, list_extensions,
     build, link_package, unlink_package, build_check,
     disable_extension, enable_extension, get_app_info,
-    _test_overlap
+    _find_missing, _get_disabled_test, _read_package, _test_overlap,
+    _validate_extension
 )
 
 here = os.path.dirname(os.path.abspath(__file__))
@@ -234,6 +236,93 @@ class TestExtension(TestCase):
         linked = get_app_info(self.app_dir)['linked_packages']
         assert self.pkg_names['package'] not in linked
 
+    def test_write_build_config(self):
+        handler = commands._AppHandler(self.app_dir)
+        target = pjoin(self.app_dir, 'settings', 'build_config.json')
+        handler._write_build_config(dict(foo='bar'))
+        with open(target) as fid:
+            assert json.load(fid) == dict(foo='bar')
+
+        # An unchanged config is not rewritten.
+        mtime = touch(target, 1)
+        handler._write_build_config(dict(foo='bar'))
+        assert os.stat(target).st_mtime == mtime
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason='needs symlinks')
+    def test_write_build_config_symlink(self):
+        handler = commands._AppHandler(self.app_dir)
+        target = pjoin(self.app_dir, 'settings', 'build_config.json')
+        handler._write_build_config(dict(foo='bar'))
+
+        # A changed config is written through a symlink.
+        real = pjoin(self.tempdir(), 'build_config.json')
+        shutil.move(target, real)
+        os.symlink(real, target)
+        handler._write_build_config(dict(foo='baz'))
+        assert os.path.islink(target)
+        with open(real) as fid:
+            assert json.load(fid) == dict(foo='baz')
+        assert handler._read_build_config() == dict(foo='baz')
+
+    def test_populate_staging_locals(self):
+        install_extension(self.mock_extension)
+        link_package(self.mock_mimeextension)
+        link_package(self.mock_package)
+        handler = commands._AppHandler(self.app_dir)
+        handler._populate_staging()
+
+        with open(pjoin(self.app_dir, 'staging', 'package.json')) as fid:
+            data = json.load(fid)
+        for name in ['extension', 'mimeextension', 'package']:
+            path = data['dependencies'][self.pkg_names[name]]
+            assert path.startswith('file:')
+            assert os.path.exists(pjoin(self.app_dir, 'staging', path[5:]))
+
+        linked = os.listdir(pjoin(self.app_dir, 'staging', 'linked_packages'))
+        assert len(linked) == 1
+
+    def test_get_app_info_copy(self):
+        info = get_app_info(self.app_dir)
+        version = info['core_data']['jupyterlab']['version']
+        info['core_data']['jupyterlab']['version'] = 'foo'
+        assert get_app_info(self.app_dir)['version'] == version
+        assert commands.get_app_version() == version
+
+    def test_populate_staging_copies(self):
+        here = self.tempdir()
+        shutil.copytree(pjoin(commands.HERE, 'staging'),
+                        pjoin(here, 'staging'))
+        p = patch.object(commands, 'HERE', here)
+        p.start()
+        self.addCleanup(p.stop)
+
+        handler = commands._AppHandler(self.app_dir)
+        handler._populate_staging()
+        target = pjoin(self.app_dir, 'staging', 'index.js')
+        mtime = os.stat(target).st_mtime
+
+        # Untouched staging files are not copied again.
+        with patch('shutil.copy', wraps=shutil.copy) as copy:
+            handler._populate_staging()
+        assert not copy.called
+        assert os.stat(target).st_mtime == mtime
+
+        # A template change with the same size is copied even if the
+        # template keeps an old mtime, since its ctime is bumped.
+        source = pjoin(here, 'staging', 'index.js')
+        with open(source, 'rb') as fid:
+            data = fid.read()
+        with open(source, 'wb') as fid:
+            fid.write(data[:-1] + (b'\n' if data[-1:] == b' ' else b' '))
+        touch(source, 1)
+        # Stage the old copy just before the change.
+        touch(target, os.stat(source).st_ctime - 1)
+        with patch('shutil.copy', wraps=shutil.copy) as copy:
+            handler._populate_staging()
+        copy.assert_called_once_with(source, target)
+        with open(target, 'rb') as fid:
+            assert fid.read() != data
+
     def test_list_extensions(self):
         install_extension(self.mock_extension)
         list_extensions()
@@ -408,6 +497,18 @@ class TestExtension(TestCase):
             fid.write(orig)
         assert not build_check()
 
+    def test_validate_extension(self):
+        data = dict(jupyterlab=dict(extension=True, themeDir='style'))
+        data['jupyterlab_extracted_files'] = ['index.js', 'style/index.css']
+        assert _validate_extension(data) == []
+
+        data['jupyterlab']['schemaDir'] = 'schema'
+        data['jupyterlab_extracted_files'].remove('index.js')
+        assert _validate_extension(data) == [
+            'Missing extension module "index.js"',
+            'schemaDir is empty: "schema"'
+        ]
+
     def test_compatibility(self):
         assert _test_overlap('^0.6.0', '^0.6.1')
         assert _test_overlap('>0.1', '0.6')
@@ -419,3 +520,68 @@ class TestExtension(TestCase):
 
         assert _test_overlap('*', '0.6') is None
         assert _test_overlap('<0.6', '0.1') is None
+
+    def test_read_package(self):
+        target = pjoin(self.tempdir(), 'foo.tgz')
+        with tarfile.open(target, 'w:gz') as tar:
+            for name in ['package.json', 'index.js']:
+                src = pjoin(self.mock_extension, name)
+                tar.add(src, arcname='foo/' + name)
+        data = _read_package(target)
+        assert data['name'] == self.pkg_names['extension']
+        assert 'index.js' in data['jupyterlab_extracted_files']
+
+    def test_get_disabled_test(self):
+        is_disabled = _get_disabled_test(['@foo/bar', 'baz.*', '(?i)qux'])
+        assert is_disabled('@foo/bar')
+        assert is_disabled('@foo/barfly')
+        assert is_disabled('bazooka')
+        assert is_disabled('QUX')
+        assert not is_disabled('@foo/ba')
+        assert not is_disabled('foobaz')
+        assert not is_disabled('@FOO/BAR')
+        assert not is_disabled('BAZOOKA')
+
+        is_disabled = _get_disabled_test(['(a)\\1', 'b'])
+        assert is_disabled('aa')
+        assert not is_disabled('ab')
+        assert not _get_disabled_test()('foo')
+
+    def test_find_missing(self):
+        tempdir = self.tempdir()
+        for name in ['a', 'b']:
+            touch(pjoin(tempdir, name))
+        paths = [pjoin(tempdir, name) for name in ['a', 'b', 'c']]
+        paths.append(pjoin(tempdir, 'd', 'e'))
+        paths.append(pjoin(here, 'test_jupyterlab.py'))
+        assert _find_missing(paths) == set(paths[2:4])
+
+        # An unreadable directory does not make its contents missing.
+        with patch.object(commands, 'scandir', side_effect=OSError):
+            assert _find_missing(paths) == set(paths[2:4])
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason='needs symlinks')
+    def test_find_missing_broken_link(self):
+        tempdir = self.tempdir()
+        touch(pjoin(tempdir, 'a'))
+        os.symlink(pjoin(tempdir, 'a'), pjoin(tempdir, 'b'))
+        os.symlink(pjoin(tempdir, 'nonexistent'), pjoin(tempdir, 'c'))
+        paths = [pjoin(tempdir, name) for name in ['a', 'b', 'c']]
+        assert _find_missing(paths) == set([paths[2]])
+
+    def test_build_check_fast(self):
+        install_extension(self.mock_extension)
+        name = self.pkg_names['extension']
+
+        # Use the core package data as an outdated build.
+        static = pjoin(self.app_dir, 'static', 'package.json')
+        touch(static)
+        shutil.copy(pjoin(commands.HERE, 'staging', 'package.json'), static)
+        touch(static, 1)
+        handler = commands._AppHandler(self.app_dir)
+        assert '%s needs to be included' % name in handler.build_check(True)
+
+        # A build newer than all of its inputs is not checked further.
+        touch(static, os.stat(static).st_ctime + 60)
+        handler = commands._AppHandler(self.app_dir)
+        assert handler.build_check(True) == []